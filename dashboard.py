@@ -4,12 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from pymongo import MongoClient
 from datetime import datetime, timedelta
+import os
 import time
 
-# Initialize MongoDB connection
-client = MongoClient("mongodb://localhost:27017/")
-db = client["resource_allocation"]
-synthetic_collection = db["synthetic_data"]
+from metrics import DASHBOARD_RENDER, SNAPSHOT_AGE, start_metrics_server, timed
+from snapshot_cache import SnapshotCache
+
+# Port for the dashboard's /metrics endpoint; set to 0 to disable
+METRICS_PORT = int(os.environ.get("RAPID_RELIEF_DASHBOARD_METRICS_PORT", "8001"))
 
 # City coordinates
 CITY_COORDINATES = {
@@ -58,20 +60,56 @@ COLOR_MAPPINGS = {
     }
 }
 
-# Initialize session state
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = datetime.now()
-if 'previous_data' not in st.session_state:
-    st.session_state.previous_data = None
-if 'selected_map_view' not in st.session_state:
-    st.session_state.selected_map_view = 'severity'
-if 'map_style' not in st.session_state:
-    st.session_state.map_style = 'Basic'
+def init_session_state():
+    """Initialize per-session state"""
+    if 'last_update' not in st.session_state:
+        st.session_state.last_update = datetime.now()
+    if 'previous_summary' not in st.session_state:
+        st.session_state.previous_summary = None
+    if 'selected_map_view' not in st.session_state:
+        st.session_state.selected_map_view = 'severity'
+    if 'map_style' not in st.session_state:
+        st.session_state.map_style = 'Basic'
+
+@st.cache_resource
+def get_snapshot_cache():
+    """Shared MongoDB connection and snapshot cache for all sessions"""
+    client = MongoClient("mongodb://localhost:27017/")
+    db = client["resource_allocation"]
+    return SnapshotCache(db["synthetic_data"])
+
+@st.cache_resource
+def start_dashboard_metrics():
+    """Start the metrics endpoint once per server process"""
+    if not METRICS_PORT:
+        return None
+    return start_metrics_server(METRICS_PORT)
 
 def load_data():
-    """Load data from MongoDB"""
-    data = list(synthetic_collection.find({}, {'_id': 0}))
-    return pd.DataFrame(data)
+    """Load the latest shared snapshot"""
+    return get_snapshot_cache().get_snapshot()
+
+@timed("compute_summary")
+def compute_summary(df):
+    """Compute the top-row metrics"""
+    return {
+        "regions": len(df),
+        "average_severity": df['severity_score'].mean(),
+        "blocked_roads": df['road_block_status'].sum(),
+        "total_population": df['population_density'].sum()
+    }
+
+@timed("create_severity_chart")
+def create_severity_chart(df):
+    """Create regional severity chart"""
+    return px.bar(
+        df,
+        x='region_name',
+        y='severity_score',
+        color='severity_score',
+        color_continuous_scale='RdYlGn_r',
+        title='Regional Severity Scores'
+    )
 
 def get_marker_properties(row, view_type):
     """Get marker properties based on selected view"""
@@ -103,12 +141,13 @@ def get_marker_properties(row, view_type):
             return 'rgba(255,165,0,0.6)', f"Blocked roads: {blocks}"
         return 'rgba(0,255,0,0.6)', f"Blocked roads: {blocks}"
 
-def create_map(df):
+@timed("create_map")
+def create_map(df, view_type, map_style):
     """Create an interactive map with resource status indicators"""
     fig = go.Figure()
     
     # Create legend traces
-    legend_colors = COLOR_MAPPINGS[st.session_state.selected_map_view]
+    legend_colors = COLOR_MAPPINGS[view_type]
     for color, label in legend_colors.items():
         rgba_color = color.replace('red', 'rgba(255,0,0,0.6)')\
                          .replace('orange', 'rgba(255,165,0,0.6)')\
@@ -129,7 +168,7 @@ def create_map(df):
         city_name = row['region_name']
         coords = CITY_COORDINATES[city_name]
         
-        color, status_text = get_marker_properties(row, st.session_state.selected_map_view)
+        color, status_text = get_marker_properties(row, view_type)
         
         hover_text = f"<b>{city_name}</b><br>{status_text}<br>"
         
@@ -154,7 +193,7 @@ def create_map(df):
     
     fig.update_layout(
         mapbox=dict(
-            style=MAP_STYLES[st.session_state.map_style],
+            style=MAP_STYLES[map_style],
             center=dict(lat=20.5937, lon=78.9629),  # Center of India
             zoom=4
         ),
@@ -170,6 +209,7 @@ def create_map(df):
     
     return fig
 
+@timed("create_resource_chart")
 def create_resource_chart(df):
     """Create resource comparison chart"""
     # Prepare data for the chart
@@ -199,6 +239,7 @@ def create_resource_chart(df):
     
     return fig
 
+@timed("calculate_resource_recommendations")
 def calculate_resource_recommendations(df):
     """Calculate resource allocation recommendations"""
     recommendations = []
@@ -237,6 +278,8 @@ def main():
     st.set_page_config(layout="wide", page_title="Real-time Resource Allocation Dashboard")
     
     st.title("🌐 Real-time Disaster Resource Management Dashboard")
+    init_session_state()
+    start_dashboard_metrics()
     
     # Add map controls in the sidebar
     st.sidebar.header("Map Controls")
@@ -255,32 +298,40 @@ def main():
     main_container = st.container()
     
     with main_container:
-        # Load new data
-        df = load_data()
+        # Load new data; derived results are shared by every session
+        # viewing the same snapshot version
+        render_start = time.perf_counter()
+        cache = get_snapshot_cache()
+        snapshot = load_data()
+        df = snapshot.data
+        if 'timestamp' in df.columns:
+            SNAPSHOT_AGE.set((datetime.now() - df['timestamp'].max()).total_seconds())
+        view_type = st.session_state.selected_map_view
+        map_style = st.session_state.map_style
+        summary = cache.get_derived(snapshot.version, 'summary', lambda: compute_summary(df))
         
         # Top metrics row
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Regions Monitored", len(df))
+            st.metric("Regions Monitored", summary["regions"])
         with col2:
-            current_severity = df['severity_score'].mean()
-            if st.session_state.previous_data is not None:
-                previous_severity = st.session_state.previous_data['severity_score'].mean()
+            current_severity = summary["average_severity"]
+            if st.session_state.previous_summary is not None:
+                previous_severity = st.session_state.previous_summary["average_severity"]
                 delta = current_severity - previous_severity
             else:
                 delta = None
             st.metric("Average Severity", f"{current_severity:.1f}", 
                       delta=f"{delta:.1f}" if delta else None)
         with col3:
-            blocked_roads = df['road_block_status'].sum()
-            st.metric("Blocked Roads", blocked_roads)
+            st.metric("Blocked Roads", summary["blocked_roads"])
         with col4:
-            total_population = df['population_density'].sum()
-            st.metric("Total Population", f"{total_population:,}")
+            st.metric("Total Population", f"{summary['total_population']:,}")
 
         # Add the map
-        st.subheader(f"📍 Real-time {st.session_state.selected_map_view.capitalize()} Status Map")
-        fig_map = create_map(df)
+        st.subheader(f"📍 Real-time {view_type.capitalize()} Status Map")
+        fig_map = cache.get_derived(snapshot.version, ('map', view_type, map_style),
+                                    lambda: create_map(df, view_type, map_style))
         st.plotly_chart(fig_map, use_container_width=True)
 
         # Create two columns for main visualizations
@@ -288,24 +339,20 @@ def main():
 
         with col_left:
             # Severity Chart
-            fig_severity = px.bar(
-                df,
-                x='region_name',
-                y='severity_score',
-                color='severity_score',
-                color_continuous_scale='RdYlGn_r',
-                title='Regional Severity Scores'
-            )
+            fig_severity = cache.get_derived(snapshot.version, 'severity_chart',
+                                             lambda: create_severity_chart(df))
             st.plotly_chart(fig_severity, use_container_width=True)
 
             # Resource Status
-            fig_resources = create_resource_chart(df)
+            fig_resources = cache.get_derived(snapshot.version, 'resource_chart',
+                                              lambda: create_resource_chart(df))
             st.plotly_chart(fig_resources, use_container_width=True)
 
         with col_right:
             # Critical Recommendations
             st.subheader("📊 Situation Analysis")
-            recommendations = calculate_resource_recommendations(df)
+            recommendations = cache.get_derived(snapshot.version, 'recommendations',
+                                                lambda: calculate_resource_recommendations(df))
             
             for rec in recommendations:
                 color = {
@@ -328,7 +375,8 @@ def main():
         st.markdown(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
         # Update previous data
-        st.session_state.previous_data = df
+        st.session_state.previous_summary = summary
+        DASHBOARD_RENDER.observe(time.perf_counter() - render_start)
 
         # Trigger a rerun every 3 seconds
         time.sleep(3)
@@ -1,9 +1,12 @@
+import argparse
 import tensorflow as tf
 import numpy as np
 from pymongo import MongoClient
-import time
 from datetime import datetime
 
+from metrics import (DB_OP_LATENCY, DOCS_WRITTEN, STAGE_DURATION, add_instrumentation_arguments,
+                     run_ticks, start_instrumentation, timed)
+
 class GANGenerator:
     def __init__(self):
         self.client = MongoClient("mongodb://localhost:27017/")
@@ -25,9 +28,11 @@ class GANGenerator:
             "Bangalore": {"base_population": 220000, "base_resources": {"food": 2000, "water": 3000, "medical": 1000}}
         }
 
+    @timed("generate")
     def generate(self):
         noise = np.random.normal(0, 1, (1, 5))
-        gan_output = self.generator.predict(noise, verbose=0)[0]
+        with STAGE_DURATION.time(stage="predict"):
+            gan_output = self.generator.predict(noise, verbose=0)[0]
         
         synthetic_data = []
         for idx in range(5):  # 5 cities
@@ -56,13 +61,24 @@ class GANGenerator:
         base = self.city_templates[city_name]["base_resources"]
         return {k: v * np.random.uniform(0.8, 2.0) for k, v in base.items()}
 
-    def run(self):
-        while True:
-            data = self.generate()
+    def run(self, profiler=None):
+        run_ticks(self._tick, 3, source="gan_generator", profiler=profiler)
+
+    def _tick(self):
+        data = self.generate()
+        with DB_OP_LATENCY.time(op="delete_many", collection="gan_data"):
             self.collection.delete_many({})
+        with DB_OP_LATENCY.time(op="insert_many", collection="gan_data"):
             self.collection.insert_many(data)
-            time.sleep(3)
+        DOCS_WRITTEN.inc(len(data), collection="gan_data")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate GAN data every 3 seconds")
+    # gan_model.py uses 8000, the dashboard 8001 and replay.py 8002
+    add_instrumentation_arguments(parser, metrics_port=8003, profile_output="gan_generator.folded")
+    args = parser.parse_args()
+
+    profiler = start_instrumentation(args)
+
     gan = GANGenerator()
-    gan.run()
\ No newline at end of file
+    gan.run(profiler)
@@ -1,15 +1,24 @@
 # gan_model.py - Updated version with enhanced resource dynamics
 
+import argparse
 import numpy as np
 from pymongo import MongoClient
-import time
 from datetime import datetime
 
+from metrics import (DB_OP_LATENCY, DOCS_WRITTEN, add_instrumentation_arguments, run_ticks,
+                     start_instrumentation, timed)
+
 class RealisticDataGenerator:
-    def __init__(self):
+    def __init__(self, record_history=False):
         self.client = MongoClient("mongodb://localhost:27017/")
         self.db = self.client["resource_allocation"]
         self.collection = self.db["synthetic_data"]
+        # Append-only copy of every snapshot, used by replay.py
+        self.history_collection = self.db["synthetic_history"]
+        self.record_history = record_history
+        if record_history:
+            # replay.py reads history sorted by timestamp
+            self.history_collection.create_index("timestamp")
         
         # Initialize base states with realistic parameters
         self.base_states = {
@@ -92,6 +101,7 @@ class RealisticDataGenerator:
             needs[resource] = max(0, need * surge_factor)
         return needs
 
+    @timed("generate_synthetic_data")
     def generate_synthetic_data(self):
         """Generate synthetic data with more dynamic resource changes"""
         current_time = datetime.now()
@@ -161,15 +171,30 @@ class RealisticDataGenerator:
             })
 
         # Update MongoDB
-        self.collection.delete_many({})
-        self.collection.insert_many(synthetic_data)
+        with DB_OP_LATENCY.time(op="delete_many", collection="synthetic_data"):
+            self.collection.delete_many({})
+        with DB_OP_LATENCY.time(op="insert_many", collection="synthetic_data"):
+            self.collection.insert_many(synthetic_data)
+        DOCS_WRITTEN.inc(len(synthetic_data), collection="synthetic_data")
+        if self.record_history:
+            # insert_many adds _id to the dicts, so store clean copies
+            history = [{k: v for k, v in entry.items() if k != "_id"} for entry in synthetic_data]
+            with DB_OP_LATENCY.time(op="insert_many", collection="synthetic_history"):
+                self.history_collection.insert_many(history)
+            DOCS_WRITTEN.inc(len(history), collection="synthetic_history")
         print(f"Generated realistic data at {current_time}")
 
 def main():
-    generator = RealisticDataGenerator()
-    while True:
-        generator.generate_synthetic_data()
-        time.sleep(3)  # Update every 3 seconds
+    parser = argparse.ArgumentParser(description="Generate realistic synthetic data every 3 seconds")
+    add_instrumentation_arguments(parser, metrics_port=8000, profile_output="gan_model.folded")
+    parser.add_argument("--record-history", action="store_true", help="Also append every snapshot to synthetic_history")
+    args = parser.parse_args()
+
+    profiler = start_instrumentation(args)
+
+    generator = RealisticDataGenerator(record_history=args.record_history)
+    # Update every 3 seconds
+    run_ticks(generator.generate_synthetic_data, 3, source="gan_model", profiler=profiler)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,106 @@
+import argparse
+import threading
+import time
+
+import pandas as pd
+from pymongo import MongoClient
+
+from dashboard import (
+    MAP_STYLES,
+    calculate_resource_recommendations,
+    compute_summary,
+    create_map,
+    create_resource_chart,
+    create_severity_chart,
+)
+from snapshot_cache import SnapshotCache
+
+VIEW_TYPES = ['severity', 'food', 'water', 'medical', 'roads']
+
+
+def render_tick(df, version, cache, view_type, map_style):
+    """Do the same data work one dashboard rerun does"""
+    if cache is None:
+        compute_summary(df)
+        create_map(df, view_type, map_style)
+        create_severity_chart(df)
+        create_resource_chart(df)
+        calculate_resource_recommendations(df)
+        return
+    cache.get_derived(version, 'summary', lambda: compute_summary(df))
+    cache.get_derived(version, ('map', view_type, map_style),
+                      lambda: create_map(df, view_type, map_style))
+    cache.get_derived(version, 'severity_chart', lambda: create_severity_chart(df))
+    cache.get_derived(version, 'resource_chart', lambda: create_resource_chart(df))
+    cache.get_derived(version, 'recommendations',
+                      lambda: calculate_resource_recommendations(df))
+
+
+def run_session(session_id, collection, cache, ticks, interval, timings, queries):
+    """Simulate one viewer refreshing the dashboard"""
+    map_styles = list(MAP_STYLES.keys())
+    view_type = VIEW_TYPES[session_id % len(VIEW_TYPES)]
+    map_style = map_styles[session_id % len(map_styles)]
+
+    for _ in range(ticks):
+        start = time.perf_counter()
+        if cache is None:
+            df = pd.DataFrame(list(collection.find({}, {'_id': 0})))
+            queries.append(1)
+            version = None
+        else:
+            snapshot = cache.get_snapshot()
+            df, version = snapshot.data, snapshot.version
+        if not df.empty:
+            render_tick(df, version, cache, view_type, map_style)
+        timings.append(time.perf_counter() - start)
+        time.sleep(interval)
+
+
+def run_load_test(sessions, ticks, interval, use_cache):
+    client = MongoClient("mongodb://localhost:27017/")
+    collection = client["resource_allocation"]["synthetic_data"]
+    cache = SnapshotCache(collection) if use_cache else None
+
+    timings = []
+    queries = []
+    threads = [
+        threading.Thread(target=run_session,
+                         args=(i, collection, cache, ticks, interval, timings, queries))
+        for i in range(sessions)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    mode = "shared cache" if use_cache else "no cache"
+    print(f"[{mode}] {sessions} sessions x {ticks} ticks in {elapsed:.2f}s")
+    print(f"  tick time p50: {timings[len(timings) // 2] * 1000:.1f} ms, "
+          f"p95: {timings[int(len(timings) * 0.95)] * 1000:.1f} ms")
+    if use_cache:
+        print(f"  mongo queries: {cache.stats['fetches']}, computes: {cache.stats['computes']}, "
+              f"snapshot hits: {cache.stats['snapshot_hits']}, derived hits: {cache.stats['derived_hits']}")
+    else:
+        print(f"  mongo queries: {len(queries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many concurrent dashboard sessions")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=3.0, help="Seconds between reruns")
+    parser.add_argument("--compare", action="store_true", help="Also run without the shared cache")
+    args = parser.parse_args()
+
+    run_load_test(args.sessions, args.ticks, args.interval, use_cache=True)
+    if args.compare:
+        run_load_test(args.sessions, args.ticks, args.interval, use_cache=False)
+
+
+if __name__ == "__main__":
+    main()
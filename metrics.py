@@ -0,0 +1,302 @@
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from sub-millisecond DB ops up to slow ticks
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent inside the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TICK_DURATION = REGISTRY.register(Histogram(
+    "rapid_relief_tick_duration_seconds", "Time spent producing one generator tick"))
+TICK_LAG = REGISTRY.register(Gauge(
+    "rapid_relief_tick_lag_seconds", "How far the last tick started behind its scheduled start"))
+TICKS = REGISTRY.register(Counter(
+    "rapid_relief_ticks_total", "Generator ticks completed"))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "rapid_relief_stage_duration_seconds", "Time spent in a pipeline stage"))
+DB_OP_LATENCY = REGISTRY.register(Histogram(
+    "rapid_relief_db_op_latency_seconds", "MongoDB operation latency"))
+DOCS_WRITTEN = REGISTRY.register(Counter(
+    "rapid_relief_docs_written_total", "Documents written to MongoDB"))
+DASHBOARD_RENDER = REGISTRY.register(Histogram(
+    "rapid_relief_dashboard_render_seconds", "Time spent rendering one dashboard rerun"))
+SNAPSHOT_AGE = REGISTRY.register(Gauge(
+    "rapid_relief_snapshot_age_seconds", "Age of the data shown on the dashboard when rendered"))
+
+
+def timed(stage):
+    """Decorator recording a function's duration under STAGE_DURATION"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with STAGE_DURATION.time(stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the console
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve REGISTRY on http://host:port/metrics from a daemon thread.
+
+    Metrics are optional, so a port that is already taken only logs a
+    warning and returns None instead of stopping the caller.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Warning: metrics endpoint disabled, could not bind {host}:{port} ({e})")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def add_instrumentation_arguments(parser, metrics_port, profile_output):
+    """Add the --metrics-port/--profile-ticks/--profile-output options"""
+    parser.add_argument("--metrics-port", type=int, default=metrics_port, help="Port for the /metrics endpoint (0 to disable)")
+    parser.add_argument("--profile-ticks", type=int, default=0, help="Sample stacks for this many ticks")
+    parser.add_argument("--profile-output", default=profile_output, help="Where to write the collapsed stacks")
+
+
+def start_instrumentation(args):
+    """Start the metrics endpoint and return a profiler if one was requested"""
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    return SamplingProfiler(args.profile_ticks, args.profile_output) if args.profile_ticks else None
+
+
+def record_tick(source, duration, lag=None):
+    """Record one completed tick and, for paced loops, how late it started"""
+    if lag is not None:
+        TICK_LAG.set(lag, source=source)
+    TICK_DURATION.observe(duration, source=source)
+    TICKS.inc(source=source)
+
+
+def run_ticks(tick, interval, source, profiler=None):
+    """Call tick() every interval seconds forever, recording tick metrics.
+
+    Ticks are scheduled against absolute deadlines, so TICK_LAG reports how
+    far a tick started behind its scheduled start. After an overrun the
+    schedule restarts from that tick instead of firing the missed ticks
+    back-to-back.
+    """
+    scheduled_start = time.perf_counter()
+    while True:
+        tick_start = time.perf_counter()
+        lag = max(0.0, tick_start - scheduled_start)
+        if lag > 0:
+            scheduled_start = tick_start
+
+        if profiler is not None and not profiler.finished:
+            with profiler.tick():
+                tick()
+        else:
+            tick()
+
+        record_tick(source, time.perf_counter() - tick_start, lag)
+
+        scheduled_start += interval
+        delay = scheduled_start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SamplingProfiler:
+    """Samples the calling thread's stack during ticks.
+
+    After the requested number of ticks the samples are written in the
+    collapsed-stack format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, ticks, output="profile.folded", interval=0.005):
+        self.ticks = ticks
+        self.output = output
+        self.interval = interval
+        self.samples = StackCounter()
+        self._ticks_done = 0
+        self._target = None
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def finished(self):
+        return self._ticks_done >= self.ticks
+
+    @contextmanager
+    def tick(self):
+        """Sample the current thread for the duration of the with-block"""
+        if self.finished:
+            yield
+            return
+        if self._thread is None:
+            self._target = threading.get_ident()
+            self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        self._active.set()
+        try:
+            yield
+        finally:
+            self._active.clear()
+            self._ticks_done += 1
+            if self.finished:
+                self._stopped.set()
+                self._thread.join()
+                self.dump()
+
+    def _sample(self):
+        while not self._stopped.is_set():
+            if not self._active.wait(timeout=0.1):
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def dump(self):
+        with open(self.output, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Wrote {sum(self.samples.values())} samples from {self.ticks} ticks to {self.output}")
@@ -0,0 +1,245 @@
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+
+from pymongo import MongoClient, UpdateOne
+
+from metrics import DB_OP_LATENCY, DOCS_WRITTEN, record_tick, start_metrics_server
+from resource_allocation import allocate_resources
+from severity_calculation import calculate_severity
+from snapshot_cache import SnapshotCache
+
+client = MongoClient("mongodb://localhost:27017/")
+db = client["resource_allocation"]
+synthetic_collection = db["synthetic_data"]
+initial_data_collection = db["initial_data"]
+
+
+def load_snapshots_from_mongo(collection_name="synthetic_history"):
+    """Load recorded snapshots, one list of region documents per tick"""
+    # Without an index a long recording exceeds Mongo's in-memory sort limit
+    db[collection_name].create_index("timestamp")
+    documents = db[collection_name].find({}, {'_id': 0}).sort([("timestamp", 1), ("region_id", 1)])
+    return [list(group) for _, group in groupby(documents, key=lambda d: d["timestamp"])]
+
+
+def load_snapshots_from_file(path):
+    """Load snapshots exported with `replay.py export`"""
+    snapshots = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            snapshot = json.loads(line)
+            for entry in snapshot:
+                entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def export_snapshots(snapshots, path):
+    """Write one JSON array of region documents per line"""
+    with open(path, "w") as f:
+        for snapshot in snapshots:
+            f.write(json.dumps(snapshot, default=lambda v: v.isoformat()) + "\n")
+    print(f"Exported {len(snapshots)} snapshots to {path}")
+
+
+class VisibilityObserver:
+    """Polls the dashboard's snapshot cache and records when each write becomes visible"""
+
+    def __init__(self, poll_interval=0.05):
+        self.cache = SnapshotCache(synthetic_collection)
+        self.poll_interval = poll_interval
+        self.written = {}
+        self.latencies = []
+        # Writes overwritten by a newer tick before the cache ever saw them
+        self.superseded = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._poll, name="visibility-observer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def record_write(self, timestamp, written_at):
+        with self._lock:
+            self.written[timestamp] = written_at
+
+    def _poll(self):
+        while not self._stopped.is_set():
+            snapshot = self.cache.get_snapshot()
+            if 'timestamp' in snapshot.data.columns and not snapshot.data.empty:
+                timestamp = snapshot.data['timestamp'].max().to_pydatetime()
+                seen_at = time.perf_counter()
+                with self._lock:
+                    written_at = self.written.pop(timestamp, None)
+                    older = [t for t in self.written if t < timestamp]
+                    for t in older:
+                        del self.written[t]
+                    self.superseded += len(older)
+                if written_at is not None:
+                    self.latencies.append(seen_at - written_at)
+            time.sleep(self.poll_interval)
+
+
+class ReplayDriver:
+    def __init__(self, snapshots, speed=1.0, run_stages=True, observer=None):
+        self.snapshots = snapshots
+        # speed is a multiple of the recorded rate; 0 replays as fast as possible
+        self.speed = speed
+        self.run_stages = run_stages
+        self.observer = observer
+        self.tick_durations = []
+        self.max_schedule_lag = 0.0
+
+    def emit(self, snapshot):
+        """Write one recorded snapshot as the current state and run the downstream stages"""
+        # Restamp with the write time (truncated to Mongo's millisecond precision)
+        # so every replayed tick is a new snapshot version for the dashboard
+        now = datetime.now()
+        timestamp = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        documents = [dict(entry, timestamp=timestamp, source_timestamp=entry["timestamp"]) for entry in snapshot]
+
+        # Register the write before it starts, so latency covers the write itself
+        # and the observer can't see the snapshot before it knows about it
+        if self.observer is not None:
+            self.observer.record_write(timestamp, time.perf_counter())
+        with DB_OP_LATENCY.time(op="delete_many", collection="synthetic_data"):
+            synthetic_collection.delete_many({})
+        with DB_OP_LATENCY.time(op="insert_many", collection="synthetic_data"):
+            synthetic_collection.insert_many(documents)
+        DOCS_WRITTEN.inc(len(documents), collection="synthetic_data")
+
+        if self.run_stages:
+            updates = [
+                UpdateOne(
+                    {"region_id": entry["region_id"]},
+                    {"$set": {
+                        "population_density": entry["population_density"],
+                        "road_block_status": entry["road_block_status"],
+                        "resource_needs": entry["resource_needs"]
+                    }},
+                    upsert=True
+                )
+                for entry in snapshot
+            ]
+            with DB_OP_LATENCY.time(op="bulk_write", collection="initial_data"):
+                initial_data_collection.bulk_write(updates)
+            DOCS_WRITTEN.inc(len(updates), collection="initial_data")
+            calculate_severity()
+            allocate_resources()
+
+    def run(self, max_ticks=None):
+        snapshots = self.snapshots[:max_ticks] if max_ticks else self.snapshots
+        if not snapshots:
+            print("No snapshots to replay.")
+            return 0.0
+
+        origin = snapshots[0][0]["timestamp"]
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            lag = None
+            if self.speed > 0:
+                # Pace against an absolute schedule so per-tick overhead does not drift
+                offset = (snapshot[0]["timestamp"] - origin).total_seconds() / self.speed
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                lag = max(0.0, -delay)
+                self.max_schedule_lag = max(self.max_schedule_lag, lag)
+
+            tick_start = time.perf_counter()
+            self.emit(snapshot)
+            duration = time.perf_counter() - tick_start
+            self.tick_durations.append(duration)
+            record_tick("replay", duration, lag)
+
+        return time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(driver, observer, elapsed):
+    ticks = len(driver.tick_durations)
+    if not ticks:
+        return
+    print(f"Replayed {ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.1f} ticks/sec)")
+    print(f"  tick time p50: {percentile(driver.tick_durations, 0.5) * 1000:.1f} ms, "
+          f"p95: {percentile(driver.tick_durations, 0.95) * 1000:.1f} ms")
+    # One tick at a time, so the inverse of the mean tick time is the ceiling
+    sustainable = ticks / sum(driver.tick_durations)
+    print(f"  max sustainable rate: {sustainable:.1f} ticks/sec")
+    if driver.speed > 0:
+        print(f"  max lag behind schedule: {driver.max_schedule_lag * 1000:.1f} ms")
+    if observer is not None:
+        if observer.latencies:
+            print(f"  write -> dashboard-visible p50: {percentile(observer.latencies, 0.5) * 1000:.1f} ms, "
+                  f"p95: {percentile(observer.latencies, 0.95) * 1000:.1f} ms "
+                  f"({len(observer.latencies)}/{ticks} ticks observed, "
+                  f"{observer.superseded} superseded before visible)")
+        else:
+            print("  no replayed ticks were observed by the dashboard cache")
+
+
+def non_negative_float(value):
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or greater, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded snapshots through the pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export recorded snapshots from Mongo to a file")
+    export_parser.add_argument("--collection", default="synthetic_history")
+    export_parser.add_argument("--output", default="history.jsonl")
+
+    run_parser = subparsers.add_parser("run", help="Replay snapshots into synthetic_data")
+    run_parser.add_argument("--file", help="Replay an exported file instead of Mongo history")
+    run_parser.add_argument("--collection", default="synthetic_history")
+    run_parser.add_argument("--speed", type=non_negative_float, default=1.0,
+                            help="Multiple of the recorded rate; 0 replays as fast as possible")
+    run_parser.add_argument("--max-ticks", type=int, help="Stop after this many snapshots")
+    run_parser.add_argument("--skip-stages", action="store_true",
+                            help="Only write synthetic_data, skip severity and allocation")
+    run_parser.add_argument("--no-observe", action="store_true",
+                            help="Do not measure write to dashboard-visible latency")
+    run_parser.add_argument("--metrics-port", type=int, default=8002, help="Port for the /metrics endpoint (0 to disable)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_snapshots(load_snapshots_from_mongo(args.collection), args.output)
+        return
+
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    snapshots = load_snapshots_from_file(args.file) if args.file else load_snapshots_from_mongo(args.collection)
+    print(f"Loaded {len(snapshots)} snapshots")
+
+    observer = None if args.no_observe else VisibilityObserver()
+    if observer is not None:
+        observer.start()
+    driver = ReplayDriver(snapshots, speed=args.speed, run_stages=not args.skip_stages, observer=observer)
+    elapsed = driver.run(args.max_ticks)
+    if observer is not None:
+        # Give the last write a chance to become visible
+        time.sleep(observer.cache.ttl + observer.poll_interval)
+        observer.stop()
+    report(driver, observer, elapsed)
+
+
+if __name__ == "__main__":
+    main()
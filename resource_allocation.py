@@ -1,13 +1,17 @@
 from pymongo import MongoClient
 
+from metrics import DB_OP_LATENCY, DOCS_WRITTEN, timed
+
 client = MongoClient("mongodb://localhost:27017/")
 db = client["resource_allocation"]
 initial_data_collection = db["initial_data"]
 allocation_collection = db["resource_allocation"]
 
+@timed("allocate_resources")
 def allocate_resources():
     # Limit to 5 regions
-    regions = initial_data_collection.find({"region_id": {"$lt": 5}})
+    with DB_OP_LATENCY.time(op="find", collection="initial_data"):
+        regions = list(initial_data_collection.find({"region_id": {"$lt": 5}}))
 
     for entry in regions:
         if "severity_score" in entry:  # Check if 'severity_score' exists
@@ -18,11 +22,13 @@ def allocate_resources():
                 "water": entry["resource_needs"]["water"] * severity_score / 100,
                 "medical": entry["resource_needs"]["medical"] * severity_score / 100
             }
-            allocation_collection.update_one(
-                {"region_id": entry["region_id"]},
-                {"$set": allocation},
-                upsert=True
-            )
+            with DB_OP_LATENCY.time(op="update_one", collection="resource_allocation"):
+                allocation_collection.update_one(
+                    {"region_id": entry["region_id"]},
+                    {"$set": allocation},
+                    upsert=True
+                )
+            DOCS_WRITTEN.inc(collection="resource_allocation")
         else:
             print(f"Warning: Missing 'severity_score' for region_id {entry['region_id']}")
     print("Resources allocated based on severity scores.")
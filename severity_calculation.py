@@ -1,19 +1,27 @@
 from pymongo import MongoClient
 
+from metrics import DB_OP_LATENCY, DOCS_WRITTEN, timed
+
 client = MongoClient("mongodb://localhost:27017/")
 db = client["resource_allocation"]
 collection = db["initial_data"]
 
+@timed("calculate_severity")
 def calculate_severity():
-    for entry in collection.find():
+    with DB_OP_LATENCY.time(op="find", collection="initial_data"):
+        entries = list(collection.find())
+
+    for entry in entries:
         population_density = entry["population_density"]
         road_block_status = entry["road_block_status"]
         severity_score = population_density * (1.5 if road_block_status else 1.0)
         
-        collection.update_one(
-            {"region_id": entry["region_id"]},
-            {"$set": {"severity_score": severity_score}}
-        )
+        with DB_OP_LATENCY.time(op="update_one", collection="initial_data"):
+            collection.update_one(
+                {"region_id": entry["region_id"]},
+                {"$set": {"severity_score": severity_score}}
+            )
+        DOCS_WRITTEN.inc(collection="initial_data")
     print("Severity scores calculated and updated in MongoDB.")
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from metrics import DB_OP_LATENCY, STAGE_DURATION
+
+# How long a fetched snapshot is served before Mongo is queried again
+SNAPSHOT_TTL_SECONDS = 1.0
+# How long derived results (aggregates, figures) are kept around
+DERIVED_TTL_SECONDS = 30.0
+# Upper bound on the number of derived results held in memory
+MAX_DERIVED_ENTRIES = 64
+
+
+class Snapshot:
+    def __init__(self, version, data, fetched_at):
+        self.version = version
+        self.data = data
+        self.fetched_at = fetched_at
+
+
+class SnapshotCache:
+    """Process-wide cache of the latest synthetic_data snapshot.
+
+    All dashboard sessions share one instance, so a refresh tick costs a
+    single Mongo query no matter how many viewers are connected. Derived
+    results are keyed by snapshot version and computed once per version.
+    """
+
+    def __init__(self, collection, ttl=SNAPSHOT_TTL_SECONDS,
+                 derived_ttl=DERIVED_TTL_SECONDS, max_entries=MAX_DERIVED_ENTRIES):
+        self.collection = collection
+        self.ttl = ttl
+        self.derived_ttl = derived_ttl
+        self.max_entries = max_entries
+
+        self._snapshot = None
+        self._fetch_lock = threading.Lock()
+
+        self._derived = OrderedDict()
+        self._derived_lock = threading.Lock()
+        self._key_locks = {}
+
+        self.stats = {"fetches": 0, "snapshot_hits": 0, "computes": 0, "derived_hits": 0, "evictions": 0}
+        self._stats_lock = threading.Lock()
+
+    def get_snapshot(self):
+        """Return the latest snapshot, querying Mongo at most once per TTL"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.fetched_at < self.ttl:
+            self._count("snapshot_hits")
+            return snapshot
+
+        with self._fetch_lock:
+            # Another session may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.fetched_at < self.ttl:
+                self._count("snapshot_hits")
+                return snapshot
+
+            with STAGE_DURATION.time(stage="load_data"):
+                with DB_OP_LATENCY.time(op="find", collection="synthetic_data"):
+                    documents = list(self.collection.find({}, {'_id': 0}))
+                data = pd.DataFrame(documents)
+            self._count("fetches")
+
+            # The generators delete then insert, so a read can land on an
+            # empty collection; keep serving the previous snapshot instead
+            if data.empty and snapshot is not None:
+                snapshot.fetched_at = time.monotonic()
+                return snapshot
+
+            version = self._snapshot_version(data, documents)
+            if snapshot is not None and snapshot.version == version:
+                snapshot.fetched_at = time.monotonic()
+                return snapshot
+
+            self._snapshot = Snapshot(version, data, time.monotonic())
+            return self._snapshot
+
+    def get_derived(self, version, key, compute):
+        """Return compute() for this snapshot version, computing it only once"""
+        cache_key = (version, key)
+        entry = self._lookup(cache_key)
+        if entry is not None:
+            return entry
+
+        with self._derived_lock:
+            key_lock = self._key_locks.setdefault(cache_key, threading.Lock())
+
+        with key_lock:
+            entry = self._lookup(cache_key)
+            if entry is not None:
+                return entry
+
+            try:
+                value = compute()
+                self._count("computes")
+                with self._derived_lock:
+                    self._derived[cache_key] = (value, time.monotonic())
+                    self._evict()
+            finally:
+                # Drop the key lock even if compute() raised, so failures don't leak locks
+                with self._derived_lock:
+                    self._key_locks.pop(cache_key, None)
+            return value
+
+    def _count(self, name):
+        # Sessions update stats from many threads under different locks
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _lookup(self, cache_key):
+        with self._derived_lock:
+            entry = self._derived.get(cache_key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if time.monotonic() - created_at >= self.derived_ttl:
+                del self._derived[cache_key]
+                self._count("evictions")
+                return None
+            self._derived.move_to_end(cache_key)
+            self._count("derived_hits")
+            return value
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones over the size limit"""
+        now = time.monotonic()
+        for cache_key in [k for k, (_, created_at) in self._derived.items()
+                          if now - created_at >= self.derived_ttl]:
+            del self._derived[cache_key]
+            self._count("evictions")
+        while len(self._derived) > self.max_entries:
+            self._derived.popitem(last=False)
+            self._count("evictions")
+
+    def _snapshot_version(self, data, documents):
+        """Combine the generator's write timestamp with a digest of the documents.
+
+        The timestamp alone is not enough: a rewrite within the same
+        millisecond would otherwise keep serving the old data.
+        """
+        digest = hashlib.sha1(repr(documents).encode("utf-8")).hexdigest()[:16]
+        if 'timestamp' in data.columns and not data.empty:
+            return f"{data['timestamp'].max()}-{digest}"
+        return digest